@@ -5,49 +5,178 @@ Simulates AWS VPC functionality using Linux networking primitives
 """
 
 import subprocess
+import errno
+import functools
+import hashlib
 import json
+import re
+import shlex
+import shutil
 import sys
+import threading
 import os
-import ipaddress
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-import ipaddress
+
+# ipaddress is ~200KB of bytecode and isn't needed by cheap commands like
+# 'list', so it is imported lazily on first use
+ipaddress = None
+
+def _ipaddress():
+    global ipaddress
+    if ipaddress is None:
+        import ipaddress as _mod
+        ipaddress = _mod
+    return ipaddress
 
 # Configuration directory
 CONFIG_DIR = Path.home() / ".vpcctl"
 CONFIG_DIR.mkdir(exist_ok=True)
 
+# Shared ipset holding every NAT-enabled VPC CIDR, matched by one
+# MASQUERADE rule instead of one -s rule per VPC
+NAT_IPSET = "vpcctl-nat-src"
+
+# Precomputed pieces for the apply_firewall hot loop: policy action ->
+# iptables target, and a %-template so rule lines aren't rebuilt from a
+# fresh f-string per iteration
+FW_TARGETS = {"ALLOW": "ACCEPT", "DENY": "DROP"}
+FW_RULE_TEMPLATE = "-A INPUT -p %s --dport %s -j %s"
+
+# Ports whose ACCEPT rules are hoisted to the front of the chain: they take
+# the bulk of real traffic, so matching them early cuts per-packet cost
+FW_HOT_PORTS = frozenset((22, 53, 80, 443))
+
+# Short-circuit rule installed ahead of any policy rules: established flows
+# are the overwhelming majority of packets and skip the whole chain
+FW_CONNTRACK_RULE = "-I INPUT 1 -m conntrack --ctstate ESTABLISHED,RELATED -j ACCEPT"
+
+def _coalesce_ports(ports):
+    """Collapse a sorted, deduped port list into (lo, hi) ranges"""
+    ranges = []
+    for port in ports:
+        if ranges and port == ranges[-1][1] + 1:
+            ranges[-1] = (ranges[-1][0], port)
+        else:
+            ranges.append((port, port))
+    return ranges
+
+# JSON shim: orjson encodes/decodes 2-5x faster and emits bytes directly;
+# ujson is the next-best C implementation, and the stdlib is the floor
+try:
+    import orjson
+
+    def _json_dumps(obj):
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+
+    _json_loads = orjson.loads
+except ImportError:
+    try:
+        import ujson
+
+        def _json_dumps(obj):
+            return ujson.dumps(obj, indent=2).encode()
+
+        _json_loads = ujson.loads
+    except ImportError:
+        def _json_dumps(obj):
+            return json.dumps(obj, indent=2).encode()
+
+        _json_loads = json.loads
+
+# pyroute2 talks netlink directly over one persistent socket instead of
+# forking iproute2 per operation; optional, the ip-based paths remain the
+# fallback when it isn't installed
+try:
+    from pyroute2 import IPRoute, NetNS
+    from pyroute2.netlink.exceptions import NetlinkError
+except ImportError:
+    IPRoute = None
+    NetNS = None
+    NetlinkError = None
+
+def _netlink_ignore_exists(call, *args, **kwargs):
+    """Run a pyroute2 call, swallowing EEXIST like ignore_exists does"""
+    try:
+        call(*args, **kwargs)
+    except NetlinkError as e:
+        if e.code != errno.EEXIST:
+            raise
+
+def _atomic_write(path, data):
+    """Write bytes to path via a temp file + rename
+
+    os.replace is atomic on POSIX, so readers never observe a torn or
+    half-written config even if vpcctl dies mid-write.
+    """
+    tmp = path.with_suffix(".json.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+# Loaded-VPC cache keyed by config mtime, so repeated loads of the same
+# VPC within one process skip the open+decode+construct entirely; an
+# on-disk change invalidates the entry automatically
+_CFG_CACHE = {}
+
 class IPUtils:
-    """Simple IP address utilities"""
+    """Simple IP address utilities
+
+    The helpers are lru_cached: the same CIDR strings come up over and over
+    across create/add_subnet/fix-connectivity, and IPv4Network construction
+    is pure-Python and comparatively slow.
+    """
     
     @staticmethod
+    @functools.lru_cache(maxsize=256)
+    def parse_network(cidr):
+        """Parsed IPv4Network for a CIDR; every caller shares this cache"""
+        return _ipaddress().IPv4Network(cidr, strict=False)
+
+    @staticmethod
+    @functools.lru_cache(maxsize=256)
     def get_gateway_ip(vpc_cidr):
         """Get gateway IP (first usable IP in VPC range)"""
-        network = ipaddress.IPv4Network(vpc_cidr, strict=False)
+        network = IPUtils.parse_network(vpc_cidr)
         return str(network.network_address + 1)
     
     @staticmethod
+    @functools.lru_cache(maxsize=256)
     def get_subnet_ip(subnet_cidr):
         """Get subnet interface IP (first usable IP in subnet)"""
-        network = ipaddress.IPv4Network(subnet_cidr, strict=False)
+        network = IPUtils.parse_network(subnet_cidr)
         return f"{network.network_address + 1}/{network.prefixlen}"
 
 class Logger:
-    """Simple logging utility with enhanced error handling"""
+    """Simple logging utility with enhanced error handling
+
+    info/warn/success bypass print() and write pre-encoded bytes straight
+    to the stdout buffer — on a big bring-up there are hundreds of log
+    lines and the buffered text layer (locale encode per call) is
+    measurable. Set VPCCTL_LOG_LEVEL=2 to suppress info lines entirely
+    in scripted runs (errors always show).
+    """
+
+    _LEVEL = int(os.environ.get("VPCCTL_LOG_LEVEL", "1"))
+
     @staticmethod
     def info(msg):
-        print(f"[INFO] {msg}")
-    
+        if Logger._LEVEL <= 1:
+            sys.stdout.buffer.write(b"[INFO] " + msg.encode() + b"\n")
+
     @staticmethod
     def success(msg):
-        print(f"[SUCCESS] ✓ {msg}")
-    
+        sys.stdout.buffer.write("[SUCCESS] ✓ ".encode() + msg.encode() + b"\n")
+        sys.stdout.buffer.flush()
+
     @staticmethod
     def error(msg):
+        sys.stdout.buffer.flush()
         print(f"[ERROR] ✗ {msg}", file=sys.stderr)
-    
+
     @staticmethod
     def warn(msg):
-        print(f"[WARN] ⚠ {msg}")
+        if Logger._LEVEL <= 2:
+            sys.stdout.buffer.write("[WARN] ⚠ ".encode() + msg.encode() + b"\n")
     
     @staticmethod
     def usage_error(msg, usage_hint=None):
@@ -62,72 +191,310 @@ class Logger:
         print(f"[ERROR] ✗ Command failed: {cmd}", file=sys.stderr)
         print(f"[ERROR] ✗ Error: {error}", file=sys.stderr)
 
-def run_cmd(cmd, check=True, capture=True, ignore_exists=False, ignore_errors=False, capture_output=False):
-    """Execute shell command with logging"""
-    Logger.info(f"Executing: {cmd}")
+# stderr markers that ignore_exists treats as "already configured"; one
+# precompiled alternation instead of a chain of substring scans per error
+_IGNORE_EXISTS_RE = re.compile("|".join(map(re.escape, [
+    "File exists",
+    "Address already assigned",
+    "already exists",
+    "Cannot find device",
+    "Nexthop has invalid gateway",
+    "Attribute failed policy validation",
+    "already added",
+])))
+
+def run_cmd(cmd, check=True, capture=False, ignore_exists=False, ignore_errors=False):
+    """Execute command (argv list) with logging, without an intermediate shell
+
+    Returns the CompletedProcess, or None when a failure was swallowed via
+    ignore_exists/ignore_errors. stdout is only piped when capture=True;
+    fire-and-forget calls discard it with no pipe to allocate or drain.
+    """
+    Logger.info(f"Executing: {shlex.join(cmd)}")
     try:
-        if capture_output:
-            result = subprocess.run(cmd, shell=True, check=check, capture_output=True, text=True)
-            return result
-        else:
-            result = subprocess.run(
-                cmd, 
-                shell=True, 
-                check=check,
-                capture_output=capture,
-                text=True
-            )
-            return result.stdout if capture else None
+        # stderr stays captured unconditionally because the ignore_exists
+        # classifier below needs it
+        return subprocess.run(
+            cmd,
+            check=check,
+            stdout=subprocess.PIPE if capture else subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            text=True
+        )
     except subprocess.CalledProcessError as e:
         # Handle "already exists" or "not found" errors gracefully if requested
-        if ignore_exists and (
-            "File exists" in str(e.stderr) or 
-            "RTNETLINK answers: File exists" in str(e.stderr) or
-            "Address already assigned" in str(e.stderr) or
-            "already exists" in str(e.stderr) or
-            "Cannot find device" in str(e.stderr) or
-            "Nexthop has invalid gateway" in str(e.stderr) or
-            "Attribute failed policy validation" in str(e.stderr)
-        ):
-            Logger.warn(f"Resource already configured, continuing: {cmd}")
+        if ignore_exists and _IGNORE_EXISTS_RE.search(str(e.stderr)):
+            Logger.warn(f"Resource already configured, continuing: {shlex.join(cmd)}")
             return None
-        
+
         # Ignore all errors if requested (for cleanup operations)
         if ignore_errors:
-            Logger.warn(f"Command failed but ignoring: {cmd}")
+            Logger.warn(f"Command failed but ignoring: {shlex.join(cmd)}")
             return None
-        
-        Logger.command_failed(cmd, str(e))
-        if capture and hasattr(e, 'stderr') and e.stderr:
+
+        Logger.command_failed(shlex.join(cmd), str(e))
+        if hasattr(e, 'stderr') and e.stderr:
             Logger.error(f"Output: {e.stderr}")
         raise
 
+def run_ip_batch(lines, ns_name=None, force=True, ignore_errors=False):
+    """Apply several ip commands over a single netlink socket via 'ip -batch -'
+
+    force=True carries the batch past individual failures, but stderr is
+    captured and classified afterwards: "already exists"-class failures
+    (the only kind force is meant to ride past) are tolerated, anything
+    else raises — mirroring run_cmd's ignore_exists, which never swallowed
+    EPERM or a missing binary. ignore_errors=True swallows everything, for
+    cleanup/repair paths where partial state is expected. Pass ns_name to
+    run the whole batch inside a network namespace.
+    """
+    argv = ["ip", "netns", "exec", ns_name, "ip"] if ns_name else ["ip"]
+    if force:
+        argv.append("-force")
+    argv += ["-batch", "-"]
+    Logger.info(f"Executing batch ({len(lines)} commands): {shlex.join(argv)}")
+    result = subprocess.run(argv, input="\n".join(lines) + "\n", text=True,
+                            stderr=subprocess.PIPE)
+    if result.returncode == 0:
+        return result
+    if ignore_errors:
+        Logger.warn(f"Batch failed but ignoring: {shlex.join(argv)}")
+        return result
+    # ip prints one error line per failed command plus a 'Command failed
+    # -:N' frame; anything beyond the exists class is a real failure
+    errors = [
+        line for line in result.stderr.splitlines()
+        if line and not line.startswith("Command failed")
+        and not _IGNORE_EXISTS_RE.search(line)
+    ]
+    if errors or not result.stderr.strip():
+        Logger.command_failed(shlex.join(argv), "; ".join(errors) or f"exit status {result.returncode}")
+        raise subprocess.CalledProcessError(result.returncode, argv, stderr=result.stderr)
+    Logger.warn(f"Batch resources already configured, continuing: {shlex.join(argv)}")
+    return result
+
+# setns(2) support: lets vpcctl enter a named network namespace directly
+# instead of spawning 'ip netns exec' (which forks ip just to do the same)
+CLONE_NEWNET = 0x40000000
+
+def _enter_netns(ns_name):
+    """Join a named network namespace via libc setns(2)
+
+    Intended for use as a Popen preexec_fn; requires CAP_SYS_ADMIN and
+    CAP_NET_ADMIN (i.e. running as root, as vpcctl already assumes).
+    """
+    import ctypes
+    libc = ctypes.CDLL("libc.so.6", use_errno=True)
+    fd = os.open(f"/var/run/netns/{ns_name}", os.O_RDONLY)
+    try:
+        if libc.setns(fd, CLONE_NEWNET) != 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+    finally:
+        os.close(fd)
+
+class NamespacePool:
+    """Pool of reusable network namespaces
+
+    Namespace creation is globally serialized in the kernel and destruction
+    is asynchronous, so delete+recreate churn (e.g. tearing down and
+    rebuilding a VPC) is far slower than flushing and reusing namespaces.
+    iproute2 cannot rename a namespace, so the pool keys on the name:
+    delete() parks a flushed namespace here and a later add_subnet for the
+    same VPC/subnet picks it up without touching the kernel.
+    """
+
+    MAX_POOLED = 32
+
+    def __init__(self):
+        # Not *.json: everything matching that in CONFIG_DIR is treated as
+        # a VPC config by _vpc_names/list/delete
+        self.pool_file = CONFIG_DIR / "ns_pool"
+        legacy = CONFIG_DIR / "ns_pool.json"
+        if legacy.exists():
+            os.replace(legacy, self.pool_file)
+        # add_subnets workers acquire concurrently; every load→mutate→save
+        # of the pool file happens under this lock so no update is lost
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self.pool_file.exists():
+            return _json_loads(self.pool_file.read_bytes())
+        return []
+
+    def _save(self, names):
+        _atomic_write(self.pool_file, _json_dumps(names))
+
+    def acquire(self, ns_name):
+        """Take a pooled namespace if one matches, else create a fresh one
+
+        The pool file outlives the namespaces themselves (they live on
+        tmpfs and external cleanups delete them directly), so an entry is
+        only trusted if the namespace is still mounted.
+        """
+        with self._lock:
+            hit = False
+            names = self._load()
+            if ns_name in names:
+                names.remove(ns_name)
+                self._save(names)
+                hit = True
+        if hit:
+            if Path(f"/var/run/netns/{ns_name}").exists():
+                Logger.info(f"Reusing pooled namespace {ns_name}")
+                return
+            Logger.warn(f"Pooled namespace {ns_name} no longer exists, recreating")
+        run_cmd(["ip", "netns", "add", ns_name], ignore_exists=True)
+
+    def pooled(self):
+        """Names currently parked in the pool"""
+        with self._lock:
+            return set(self._load())
+
+    def drop(self, ns_names):
+        """Forget entries whose namespaces were deleted externally"""
+        with self._lock:
+            names = [n for n in self._load() if n not in ns_names]
+            self._save(names)
+
+    def flush(self, ns_name):
+        """Strip namespace state so it can be parked for reuse"""
+        run_ip_batch([
+            "route flush table main",
+            "addr flush scope global",
+            "link set lo down",
+        ], ns_name=ns_name, ignore_errors=True)
+
+    def release(self, ns_name, flushed=False):
+        """Flush a namespace and park it for reuse instead of deleting it"""
+        if not flushed:
+            self.flush(ns_name)
+        with self._lock:
+            names = self._load()
+            park = ns_name not in names and len(names) < self.MAX_POOLED
+            if park:
+                names.append(ns_name)
+                self._save(names)
+        if park:
+            Logger.info(f"Namespace {ns_name} returned to pool")
+        else:
+            run_cmd(["ip", "netns", "del", ns_name], check=False)
+
+_NS_POOL = NamespacePool()
+
+class NsShell:
+    """Persistent shell co-process inside a network namespace
+
+    'ip netns exec' re-opens the namespace file, calls setns and forks for
+    every single command; when a burst of commands targets the same
+    namespace, keeping one shell alive amortizes that entry cost over the
+    whole batch. Commands with a native batch tool (ip -batch,
+    iptables-restore) should keep using it — this is for everything else
+    (ps, netstat, ping, ...).
+    """
+
+    _SENTINEL = "__VPCCTL_DONE__"
+
+    def __init__(self, ns_name):
+        self.ns_name = ns_name
+        self.proc = None
+
+    def __enter__(self):
+        self.proc = subprocess.Popen(
+            ["ip", "netns", "exec", self.ns_name, "sh"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT, text=True, bufsize=1
+        )
+        return self
+
+    def run(self, cmd):
+        """Run one command in the namespace, return a CompletedProcess"""
+        self.proc.stdin.write(f"{cmd}\necho {self._SENTINEL} $?\n")
+        self.proc.stdin.flush()
+        lines = []
+        for line in self.proc.stdout:
+            if line.startswith(self._SENTINEL):
+                returncode = int(line.split()[1])
+                return subprocess.CompletedProcess(cmd, returncode, "".join(lines), None)
+            lines.append(line)
+        # Shell died mid-command
+        return subprocess.CompletedProcess(cmd, self.proc.poll() or -1, "".join(lines), None)
+
+    def __exit__(self, *exc):
+        if self.proc.stdin:
+            try:
+                self.proc.stdin.close()
+            except OSError:
+                pass
+        self.proc.wait()
+
 class VPC:
     """Represents a Virtual Private Cloud"""
-    
+
+    # Slots drop the per-instance __dict__ (~30% less memory per object
+    # when scripts bring up many VPCs)
+    __slots__ = ("name", "cidr", "bridge", "subnets", "config_file",
+                 "peerings", "_net", "_prefix", "_gateway", "_cidr_index", "_lock")
+
     def __init__(self, name, cidr):
         self.name = name
         self.cidr = cidr
+        # Parse (and implicitly validate) the CIDR once; operations reuse
+        # these instead of re-splitting the string each time
+        self._net = IPUtils.parse_network(cidr)
+        self._prefix = self._net.prefixlen
+        self._gateway = str(self._net.network_address + 1)
         self.bridge = f"vpc-{name}"
         self.subnets = {}
+        self.peerings = {}  # other VPC name -> /31 link addresses
+        self._cidr_index = {}  # cidr -> subnet name, for O(1) policy lookups
+        self._lock = threading.Lock()  # guards subnets/_cidr_index in add_subnets
         self.config_file = CONFIG_DIR / f"{name}.json"
     
     def create(self):
         """Create VPC infrastructure"""
         Logger.info(f"Creating VPC: {self.name} with CIDR: {self.cidr}")
         
-        # Create bridge (acts as VPC router)
-        run_cmd(f"ip link add {self.bridge} type bridge", ignore_exists=True)
-        run_cmd(f"ip link set {self.bridge} up")
-        
-        # Assign gateway IP to bridge (first IP in range)
-        gateway_ip = IPUtils.get_gateway_ip(self.cidr)
-        run_cmd(f"ip addr add {gateway_ip}/{self.cidr.split('/')[1]} dev {self.bridge}", ignore_exists=True)
+        # Create bridge (acts as VPC router) and assign the gateway IP
+        # (first IP in range). With pyroute2 all three operations go over
+        # one netlink socket with no ip forks at all.
+        if IPRoute is not None:
+            with IPRoute() as ipr:
+                _netlink_ignore_exists(ipr.link, "add", ifname=self.bridge, kind="bridge")
+                idx = ipr.link_lookup(ifname=self.bridge)[0]
+                ipr.link("set", index=idx, state="up")
+                _netlink_ignore_exists(
+                    ipr.addr, "add", index=idx,
+                    address=self._gateway, prefixlen=self._prefix
+                )
+        else:
+            run_ip_batch([
+                f"link add {self.bridge} type bridge",
+                f"link set {self.bridge} up",
+                f"addr add {self._gateway}/{self._prefix} dev {self.bridge}",
+            ])
         
         Logger.success(f"VPC {self.name} created with bridge {self.bridge}")
         self.save_config()
     
-    def add_subnet(self, subnet_name, cidr, subnet_type="private"):
+    def add_subnets(self, specs):
+        """Create several subnets concurrently
+
+        Each subnet's setup only touches its own namespace and veth pair,
+        so the kernel work parallelizes cleanly. specs is a list of
+        (name, cidr, type) tuples; the config is saved once at the end
+        instead of once per subnet.
+        """
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            futures = [
+                pool.submit(self.add_subnet, name, cidr, subnet_type, _save=False)
+                for name, cidr, subnet_type in specs
+            ]
+            for future in futures:
+                future.result()
+        self.save_config()
+
+    def add_subnet(self, subnet_name, cidr, subnet_type="private", _save=True):
         """Add subnet (network namespace) to VPC"""
         Logger.info(f"Adding {subnet_type} subnet: {subnet_name} ({cidr})")
         
@@ -135,74 +502,117 @@ class VPC:
         veth_host = f"veth-{subnet_name}"
         veth_ns = f"v{subnet_name[:10]}"  # Keep it short for Linux interface name limits
         
-        # Create network namespace
-        run_cmd(f"ip netns add {ns_name}", ignore_exists=True)
-        
-        # Create veth pair (virtual ethernet cable)
-        run_cmd(f"ip link add {veth_host} type veth peer name {veth_ns}", ignore_exists=True)
-        
-        # Connect host end to bridge
-        run_cmd(f"ip link set {veth_host} master {self.bridge}", ignore_exists=True)
-        run_cmd(f"ip link set {veth_host} up", ignore_exists=True)
-        
-        # Move namespace end into namespace
-        run_cmd(f"ip link set {veth_ns} netns {ns_name}", ignore_exists=True)
-        
-        # Configure namespace interface
+        # Create network namespace (or reuse a pooled one)
+        _NS_POOL.acquire(ns_name)
+
         subnet_ip = IPUtils.get_subnet_ip(cidr)
-        run_cmd(f"ip netns exec {ns_name} ip addr add {subnet_ip} dev {veth_ns}", ignore_exists=True)
-        run_cmd(f"ip netns exec {ns_name} ip link set {veth_ns} up", ignore_exists=True)
-        run_cmd(f"ip netns exec {ns_name} ip link set lo up", ignore_exists=True)
-        
-        # Add default route through bridge
-        gateway_ip = IPUtils.get_gateway_ip(self.cidr)
-        run_cmd(f"ip netns exec {ns_name} ip route add default via {gateway_ip}", ignore_exists=True)
-        
-        # Store subnet info
-        self.subnets[subnet_name] = {
-            "cidr": cidr,
-            "type": subnet_type,
-            "namespace": ns_name,
-            "veth_host": veth_host,
-            "ip": subnet_ip
-        }
+        if IPRoute is not None:
+            # Netlink fast path: host side over one IPRoute socket, then the
+            # in-namespace half over a NetNS socket — no ip forks and no
+            # namespace re-entry per command
+            with IPRoute() as ipr:
+                _netlink_ignore_exists(ipr.link, "add", ifname=veth_host,
+                                       kind="veth", peer=veth_ns)
+                host_idx = ipr.link_lookup(ifname=veth_host)[0]
+                bridge_idx = ipr.link_lookup(ifname=self.bridge)[0]
+                ipr.link("set", index=host_idx, master=bridge_idx, state="up")
+                peer_idx = ipr.link_lookup(ifname=veth_ns)
+                if peer_idx:
+                    ipr.link("set", index=peer_idx[0], net_ns_fd=ns_name)
+            with NetNS(ns_name) as ns:
+                idx = ns.link_lookup(ifname=veth_ns)[0]
+                addr, prefixlen = subnet_ip.split('/')
+                _netlink_ignore_exists(ns.addr, "add", index=idx,
+                                       address=addr, prefixlen=int(prefixlen))
+                ns.link("set", index=idx, state="up")
+                ns.link("set", index=ns.link_lookup(ifname="lo")[0], state="up")
+                _netlink_ignore_exists(ns.route, "add", dst="default",
+                                       gateway=self._gateway)
+        else:
+            # Host-side setup in one batch: veth pair, bridge attach, move
+            # one end into the namespace
+            run_ip_batch([
+                f"link add {veth_host} type veth peer name {veth_ns}",
+                f"link set {veth_host} master {self.bridge}",
+                f"link set {veth_host} up",
+                f"link set {veth_ns} netns {ns_name}",
+            ])
+
+            # In-namespace setup in a second batch: address, links up,
+            # default route through the bridge
+            run_ip_batch([
+                f"addr add {subnet_ip} dev {veth_ns}",
+                f"link set {veth_ns} up",
+                "link set lo up",
+                f"route add default via {self._gateway}",
+            ], ns_name=ns_name)
         
+        # Store subnet info; the lock keeps concurrent add_subnets workers
+        # from interleaving the shared-dict update with save_config
+        with self._lock:
+            self.subnets[subnet_name] = {
+                "cidr": cidr,
+                "type": subnet_type,
+                "namespace": ns_name,
+                "veth_host": veth_host,
+                "ip": subnet_ip
+            }
+            self._cidr_index[cidr] = subnet_name
+
         Logger.success(f"Subnet {subnet_name} created in namespace {ns_name}")
-        self.save_config()
+        if _save:
+            self.save_config()
     
     def enable_nat(self, internet_interface="eth0"):
         """Enable NAT for public subnets"""
         Logger.info(f"Enabling NAT gateway on interface {internet_interface}")
         
         # Enable IP forwarding
-        run_cmd("sysctl -w net.ipv4.ip_forward=1")
-        
-        # Setup NAT using iptables
-        run_cmd(f"iptables -t nat -A POSTROUTING -s {self.cidr} -o {internet_interface} -j MASQUERADE")
-        run_cmd(f"iptables -A FORWARD -i {self.bridge} -o {internet_interface} -j ACCEPT")
-        run_cmd(f"iptables -A FORWARD -i {internet_interface} -o {self.bridge} -m state --state RELATED,ESTABLISHED -j ACCEPT")
+        run_cmd(["sysctl", "-w", "net.ipv4.ip_forward=1"])
+
+        # Setup NAT using iptables. Source CIDRs go into one shared ipset so
+        # a single MASQUERADE rule covers every VPC -- O(1) hash lookup in
+        # the packet path instead of a linear scan over per-VPC -s rules
+        if shutil.which("ipset"):
+            run_cmd(["ipset", "create", NAT_IPSET, "hash:net", "family", "inet"], ignore_exists=True)
+            run_cmd(["ipset", "add", NAT_IPSET, self.cidr], ignore_exists=True)
+            existing = run_cmd(["iptables", "-t", "nat", "-C", "POSTROUTING", "-m", "set", "--match-set", NAT_IPSET, "src", "-o", internet_interface, "-j", "MASQUERADE"], check=False, capture=True)
+            if existing.returncode != 0:
+                run_cmd(["iptables", "-t", "nat", "-A", "POSTROUTING", "-m", "set", "--match-set", NAT_IPSET, "src", "-o", internet_interface, "-j", "MASQUERADE"])
+        else:
+            run_cmd(["iptables", "-t", "nat", "-A", "POSTROUTING", "-s", self.cidr, "-o", internet_interface, "-j", "MASQUERADE"])
+        run_cmd(["iptables", "-A", "FORWARD", "-i", self.bridge, "-o", internet_interface, "-j", "ACCEPT"])
+        # Rule ordering contract: the RELATED,ESTABLISHED accept is the
+        # hottest rule (it matches every in-flight packet), so insert it at
+        # the top of FORWARD rather than appending it below everything
+        # else. Future policy insertions should also prefer -I at the
+        # right position over -A.
+        run_cmd(["iptables", "-I", "FORWARD", "1", "-i", internet_interface, "-o", self.bridge, "-m", "state", "--state", "RELATED,ESTABLISHED", "-j", "ACCEPT"])
         
         # Add default routes in namespaces for internet access
         # The bridge currently has subnet-specific IPs, so use those as gateways
         for subnet_name, subnet_info in self.subnets.items():
             ns_name = subnet_info["namespace"]
             subnet_cidr = subnet_info["cidr"]
-            network = ipaddress.IPv4Network(subnet_cidr, strict=False)
+            network = IPUtils.parse_network(subnet_cidr)
             # Use the subnet's first IP as gateway (which is on the bridge)
             gateway_ip = str(network.network_address + 1)
             
             # Get the interface name in the namespace
-            result = run_cmd(f"ip netns exec {ns_name} ip link show | grep -o 'vn-[^@]*'", capture_output=True, ignore_errors=True)
-            if result and result.stdout:
-                interface_name = result.stdout.strip()
+            result = run_cmd(["ip", "netns", "exec", ns_name, "ip", "link", "show"], capture=True, ignore_errors=True)
+            match = re.search(r"vn-[^@:\s]*", result.stdout) if result and result.stdout else None
+            if match:
+                interface_name = match.group(0)
             else:
                 interface_name = f"vn-{subnet_name}"
-            
-            # Remove any existing default route first
-            run_cmd(f"ip netns exec {ns_name} ip route del default", ignore_errors=True)
-            
-            # Add default route via subnet gateway
-            run_cmd(f"ip netns exec {ns_name} ip route add default via {gateway_ip} dev {interface_name}", ignore_errors=True)
+
+            # Replace the default route in one in-namespace batch: a single
+            # setns+fork instead of one per route command (-force carries
+            # the batch past the del when no default route exists yet)
+            run_ip_batch([
+                "route del default",
+                f"route add default via {gateway_ip} dev {interface_name}",
+            ], ns_name=ns_name, ignore_errors=True)
             Logger.info(f"Added default route in {ns_name} via {gateway_ip} dev {interface_name}")
         
         Logger.success("NAT gateway enabled")
@@ -211,59 +621,167 @@ class VPC:
         """Apply firewall rules from JSON policy"""
         Logger.info(f"Applying firewall policy from {policy_file}")
         
-        with open(policy_file, 'r') as f:
-            policy = json.load(f)
+        policy = _json_loads(Path(policy_file).read_bytes())
         
         subnet_cidr = policy.get("subnet")
-        subnet_name = None
-        
-        # Find matching subnet
-        for name, info in self.subnets.items():
-            if info["cidr"] == subnet_cidr:
-                subnet_name = name
-                break
-        
+        subnet_name = self._cidr_index.get(subnet_cidr)
+
         if not subnet_name:
             Logger.error(f"Subnet {subnet_cidr} not found")
             return
         
         ns_name = self.subnets[subnet_name]["namespace"]
-        
-        # Apply ingress rules
+
+        # Collect rules, grouped by (protocol, target) for the set-based path
+        groups = {}
+        applied = []
         for rule in policy.get("ingress", []):
             port = rule["port"]
             protocol = rule["protocol"]
             action = rule["action"].upper()
-            
-            if action == "ALLOW":
-                target = "ACCEPT"
-            elif action == "DENY":
-                target = "DROP"
-            else:
+
+            target = FW_TARGETS.get(action)
+            if target is None:
                 continue
-            
-            cmd = f"ip netns exec {ns_name} iptables -A INPUT -p {protocol} --dport {port} -j {target}"
-            run_cmd(cmd)
+
+            groups.setdefault((protocol, target), []).append(port)
+            applied.append((protocol, port, action))
+
+        if not applied:
+            Logger.warn("No applicable ingress rules in policy")
+            return
+
+        # Optimize before installing: dedup ports, then order groups so
+        # ACCEPTs are matched before DROPs (the fallback path additionally
+        # puts hot-port ACCEPTs first and coalesces adjacent ports)
+        groups = {key: sorted(set(ports)) for key, ports in groups.items()}
+        groups = dict(sorted(groups.items(), key=lambda kv: kv[0][1] != "ACCEPT"))
+
+        if shutil.which("ipset") and shutil.which("iptables-restore"):
+            # Set+match pattern: ports for each (protocol, action) pair live
+            # in one bitmap:port ipset referenced by a single iptables rule,
+            # so packet classification is a hash lookup instead of a linear
+            # walk over N --dport rules, and install cost stays O(N)
+            set_lines = []
+            rule_lines = ["*filter", FW_CONNTRACK_RULE]
+            # ipset names cap at 31 chars; a fixed-width hash of the subnet
+            # name keeps the protocol/target suffixes intact (a raw
+            # truncation let long subnet names collapse ACCEPT and DROP
+            # sets into one, inverting the policy)
+            subnet_tag = hashlib.blake2b(subnet_name.encode(), digest_size=4).hexdigest()
+            for (protocol, target), ports in groups.items():
+                set_name = f"vpcctl-{subnet_tag}-{protocol}-{target.lower()}"
+                set_lines.append(f"create {set_name} bitmap:port range 0-65535 -exist")
+                set_lines.extend(f"add {set_name} {p} -exist" for p in ports)
+                rule_lines.append(
+                    f"-A INPUT -p {protocol} -m set --match-set {set_name} dst -j {target}"
+                )
+            rule_lines.append("COMMIT")
+
+            Logger.info(f"Applying {len(applied)} rules as {len(groups)} set-match rules")
+            result = subprocess.run(
+                ["ip", "netns", "exec", ns_name, "ipset", "restore"],
+                input="\n".join(set_lines) + "\n",
+                text=True
+            )
+            if result.returncode != 0:
+                Logger.error(f"Failed to populate ipsets in {ns_name}")
+                raise subprocess.CalledProcessError(result.returncode, "ipset restore")
+            result = subprocess.run(
+                ["ip", "netns", "exec", ns_name, "iptables-restore", "--noflush"],
+                input="\n".join(rule_lines) + "\n",
+                text=True
+            )
+            if result.returncode != 0:
+                Logger.error(f"Failed to apply firewall policy in {ns_name}")
+                raise subprocess.CalledProcessError(result.returncode, "iptables-restore")
+        else:
+            # Per-port rules, applied in a single atomic iptables-restore
+            # commit when available, else one iptables fork per rule.
+            # Adjacent same-action ports collapse into --dport lo:hi ranges
+            # and hot-port ACCEPTs go first.
+            flat = []
+            for (protocol, target), ports in groups.items():
+                for lo, hi in _coalesce_ports(ports):
+                    dport = str(lo) if lo == hi else f"{lo}:{hi}"
+                    hot = target == "ACCEPT" and lo in FW_HOT_PORTS
+                    flat.append((target != "ACCEPT", not hot, FW_RULE_TEMPLATE % (protocol, dport, target)))
+            lines = ["*filter", FW_CONNTRACK_RULE]
+            lines.extend(line for _, _, line in sorted(flat))
+            lines.append("COMMIT")
+            if shutil.which("iptables-restore"):
+                Logger.info(f"Applying {len(applied)} rules via iptables-restore")
+                result = subprocess.run(
+                    ["ip", "netns", "exec", ns_name, "iptables-restore", "--noflush"],
+                    input="\n".join(lines) + "\n",
+                    text=True
+                )
+                if result.returncode != 0:
+                    Logger.error(f"Failed to apply firewall policy in {ns_name}")
+                    raise subprocess.CalledProcessError(result.returncode, "iptables-restore")
+            else:
+                for line in lines[1:-1]:
+                    run_cmd(["ip", "netns", "exec", ns_name, "iptables"] + line.split())
+
+        for protocol, port, action in applied:
             Logger.success(f"Rule applied: {protocol}/{port} -> {action}")
     
+    @staticmethod
+    def _peering_addresses(name_a, name_b):
+        """Deterministic /31 link addresses for a VPC pair
+
+        The pair's sorted names hash to an index into 169.254.0.0/16
+        carved into /31s, so the same two VPCs always get the same
+        link-local addresses regardless of peering order — re-running
+        peer_with is a no-op rather than an address churn.
+        """
+        pair = "|".join(sorted((name_a, name_b)))
+        idx = int.from_bytes(hashlib.blake2b(pair.encode(), digest_size=2).digest(), "big") & 0x7FFF
+        base = int(_ipaddress().IPv4Address("169.254.0.0")) + idx * 2
+        first, second = str(_ipaddress().IPv4Address(base)), str(_ipaddress().IPv4Address(base + 1))
+        # .0 of the /31 always belongs to the lexicographically first name
+        return (first, second) if name_a == min(name_a, name_b) else (second, first)
+
     def peer_with(self, other_vpc):
         """Establish VPC peering connection"""
         Logger.info(f"Peering VPC {self.name} with {other_vpc.name}")
-        
+
         # Create veth pair between bridges
         peer_veth1 = f"peer-{self.name}-{other_vpc.name}"
         peer_veth2 = f"peer-{other_vpc.name}-{self.name}"
-        
-        run_cmd(f"ip link add {peer_veth1} type veth peer name {peer_veth2}")
-        run_cmd(f"ip link set {peer_veth1} master {self.bridge}")
-        run_cmd(f"ip link set {peer_veth2} master {other_vpc.bridge}")
-        run_cmd(f"ip link set {peer_veth1} up")
-        run_cmd(f"ip link set {peer_veth2} up")
-        
-        # Add routes
-        run_cmd(f"ip route add {other_vpc.cidr} via {other_vpc.cidr.split('/')[0].rsplit('.', 1)[0]}.0.1 dev {self.bridge}")
-        run_cmd(f"ip route add {self.cidr} via {self.cidr.split('/')[0].rsplit('.', 1)[0]}.0.1 dev {other_vpc.bridge}")
-        
+
+        # Both bridges must exist before anything is attached to them —
+        # "Cannot find device" is in the tolerated exists class below, so
+        # it has to be ruled out here rather than left to the batch
+        for bridge in (self.bridge, other_vpc.bridge):
+            if not Path(f"/sys/class/net/{bridge}").exists():
+                Logger.error(f"Bridge {bridge} does not exist; create both VPCs before peering")
+                return
+
+        local_ip, remote_ip = self._peering_addresses(self.name, other_vpc.name)
+
+        # All link, address and route setup in one batch over a single
+        # netlink socket; -force plus the deterministic addresses make a
+        # re-peer idempotent (EEXIST is the only expected failure), while
+        # anything else raises before the peering is recorded below
+        run_ip_batch([
+            f"link add {peer_veth1} type veth peer name {peer_veth2}",
+            f"link set {peer_veth1} master {self.bridge}",
+            f"link set {peer_veth2} master {other_vpc.bridge}",
+            f"link set {peer_veth1} up",
+            f"link set {peer_veth2} up",
+            f"addr add {local_ip}/31 dev {self.bridge}",
+            f"addr add {remote_ip}/31 dev {other_vpc.bridge}",
+            f"route add {other_vpc.cidr} via {remote_ip} dev {self.bridge}",
+            f"route add {self.cidr} via {local_ip} dev {other_vpc.bridge}",
+        ])
+
+        # Record the peering on both sides so delete/recover can see it
+        self.peerings[other_vpc.name] = {"local": local_ip, "remote": remote_ip, "veth": peer_veth1}
+        other_vpc.peerings[self.name] = {"local": remote_ip, "remote": local_ip, "veth": peer_veth2}
+        self.save_config()
+        other_vpc.save_config()
+
         Logger.success(f"VPC peering established between {self.name} and {other_vpc.name}")
     
     def deploy_webserver(self, subnet_name, port=8000):
@@ -277,34 +795,77 @@ class VPC:
         
         # Get the actual IP address assigned to the interface in the namespace
         subnet_cidr = self.subnets[subnet_name]["cidr"]
-        network = ipaddress.IPv4Network(subnet_cidr, strict=False)
+        network = IPUtils.parse_network(subnet_cidr)
         # Use the second IP in the subnet (first is gateway, second is for the interface)
         interface_ip = str(network.network_address + 2)
         
-        cmd = f"""ip netns exec {ns_name} sh -c '
-            mkdir -p /tmp/www-{subnet_name}
-            echo "<h1>Hello from {subnet_name} in VPC {self.name}</h1>" > /tmp/www-{subnet_name}/index.html
-            cd /tmp/www-{subnet_name} && python3 -m http.server {port} --bind {interface_ip} > /tmp/webserver-{subnet_name}.log 2>&1 &
-        '"""
-        run_cmd(cmd)
+        # Network namespaces don't isolate mounts, so /tmp is shared with
+        # the namespace: prepare the docroot right here in-process instead
+        # of shelling out for mkdir/echo. Only the server itself needs to
+        # run inside the namespace.
+        www_dir = Path(f"/tmp/www-{subnet_name}")
+        www_dir.mkdir(exist_ok=True)
+        (www_dir / "index.html").write_text(f"<h1>Hello from {subnet_name} in VPC {self.name}</h1>\n")
+
+        server_argv = ["python3", "-m", "http.server", str(port), "--bind", interface_ip]
+        with open(f"/tmp/webserver-{subnet_name}.log", "ab") as log:
+            if os.path.exists(f"/var/run/netns/{ns_name}"):
+                # Enter the namespace ourselves via setns() instead of
+                # spawning 'ip netns exec' (saves a fork+exec of ip)
+                Logger.info(f"Launching web server in {ns_name} via setns()")
+                subprocess.Popen(
+                    server_argv, cwd=www_dir, stdout=log, stderr=log,
+                    preexec_fn=lambda: _enter_netns(ns_name),
+                    start_new_session=True
+                )
+            else:
+                subprocess.Popen(
+                    ["ip", "netns", "exec", ns_name] + server_argv,
+                    cwd=www_dir, stdout=log, stderr=log,
+                    start_new_session=True
+                )
         Logger.success(f"Web server deployed at http://{interface_ip}:{port}")
     
     def delete(self):
         """Delete VPC and all resources"""
         Logger.info(f"Deleting VPC: {self.name}")
         
-        # Delete subnets (namespaces)
+        # Host-side link teardown is a single ip batch: every subnet veth
+        # plus the bridge in one pass (-force keeps going past links that
+        # are already gone, so re-running delete stays safe)
+        host_lines = [
+            f"link del {info['veth_host']}"
+            for info in self.subnets.values() if "veth_host" in info
+        ]
+        host_lines.append(f"link del {self.bridge}")
+        run_ip_batch(host_lines, ignore_errors=True)
+
+        # Flush namespaces in parallel (each flush only blocks on netlink
+        # and subprocess I/O releases the GIL), then park them in the pool;
+        # pool bookkeeping shares a JSON file so it stays serialized
+        def _flush_subnet(info):
+            _NS_POOL.flush(info["namespace"])
+
+        if self.subnets:
+            with ThreadPoolExecutor(max_workers=min(8, len(self.subnets))) as ex:
+                list(ex.map(_flush_subnet, self.subnets.values()))
         for subnet_name, info in self.subnets.items():
-            ns_name = info["namespace"]
             Logger.info(f"Deleting subnet {subnet_name}")
-            run_cmd(f"ip netns del {ns_name}", check=False)
-        
-        # Delete bridge
-        run_cmd(f"ip link del {self.bridge}", check=False)
-        
-        # Clean up iptables rules
+            _NS_POOL.release(info["namespace"], flushed=True)
+
+        # Clean up iptables NAT state: ipset membership, then any legacy
+        # per-CIDR MASQUERADE rule removed in one iptables-restore commit
         cidr = self.cidr
-        run_cmd(f"iptables -t nat -D POSTROUTING -s {cidr} -o eth0 -j MASQUERADE", check=False)
+        if shutil.which("ipset"):
+            run_cmd(["ipset", "del", NAT_IPSET, cidr], ignore_errors=True, check=False)
+        if shutil.which("iptables-restore"):
+            subprocess.run(
+                ["iptables-restore", "--noflush"],
+                input=f"*nat\n-D POSTROUTING -s {cidr} -o eth0 -j MASQUERADE\nCOMMIT\n",
+                text=True
+            )
+        elif shutil.which("iptables"):
+            run_cmd(["iptables", "-t", "nat", "-D", "POSTROUTING", "-s", cidr, "-o", "eth0", "-j", "MASQUERADE"], check=False)
         
         # Remove config file
         if self.config_file.exists():
@@ -318,23 +879,32 @@ class VPC:
             "name": self.name,
             "cidr": self.cidr,
             "bridge": self.bridge,
-            "subnets": self.subnets
+            "subnets": self.subnets,
+            "peerings": self.peerings
         }
-        with open(self.config_file, 'w') as f:
-            json.dump(config, f, indent=2)
-    
+        _atomic_write(self.config_file, _json_dumps(config))
+        # The in-memory instance is now the file's content; keep the cache
+        # consistent so a load right after a save is a pure dict hit
+        _CFG_CACHE[self.config_file] = (self.config_file.stat().st_mtime_ns, self)
+
     @classmethod
     def load(cls, name):
-        """Load VPC from config file"""
+        """Load VPC from config file (cached per mtime)"""
         config_file = CONFIG_DIR / f"{name}.json"
         if not config_file.exists():
             raise FileNotFoundError(f"VPC {name} not found")
-        
-        with open(config_file, 'r') as f:
-            config = json.load(f)
-        
+
+        st = config_file.stat()
+        cached = _CFG_CACHE.get(config_file)
+        if cached and cached[0] == st.st_mtime_ns:
+            return cached[1]
+
+        config = _json_loads(config_file.read_bytes())
         vpc = cls(config["name"], config["cidr"])
         vpc.subnets = config["subnets"]
+        vpc.peerings = config.get("peerings", {})
+        vpc._cidr_index = {info["cidr"]: subnet for subnet, info in vpc.subnets.items()}
+        _CFG_CACHE[config_file] = (st.st_mtime_ns, vpc)
         return vpc
     
     def show(self):
@@ -362,6 +932,518 @@ def validate_args(command, min_args, usage_hint):
         Logger.usage_error(f"Not enough arguments for '{command}' command", usage_hint)
         sys.exit(1)
 
+def cmd_create():
+    validate_args("create", 4, "Usage: vpcctl create <vpc-name> <cidr>")
+    vpc_name = sys.argv[2]
+    cidr = sys.argv[3]
+    vpc = VPC(vpc_name, cidr)
+    vpc.create()
+
+def cmd_add_subnet():
+    validate_args("add-subnet", 5, "Usage: vpcctl add-subnet <vpc-name> <subnet-name> <cidr> [type]")
+    vpc_name = sys.argv[2]
+    subnet_name = sys.argv[3]
+    cidr = sys.argv[4]
+    subnet_type = sys.argv[5] if len(sys.argv) > 5 else "private"
+    vpc = VPC.load(vpc_name)
+    vpc.add_subnet(subnet_name, cidr, subnet_type)
+
+def cmd_add_subnets():
+    validate_args("add-subnets", 4, "Usage: vpcctl add-subnets <vpc-name> <manifest.json>")
+    vpc_name = sys.argv[2]
+    manifest_file = sys.argv[3]
+    specs = _json_loads(Path(manifest_file).read_bytes())
+    vpc = VPC.load(vpc_name)
+    vpc.add_subnets([
+        (s["name"], s["cidr"], s.get("type", "private"))
+        for s in specs
+    ])
+
+def cmd_enable_nat():
+    vpc_name = sys.argv[2]
+    interface = sys.argv[3] if len(sys.argv) > 3 else "eth0"
+    vpc = VPC.load(vpc_name)
+    vpc.enable_nat(interface)
+
+def cmd_apply_policy():
+    vpc_name = sys.argv[2]
+    policy_file = sys.argv[3]
+    vpc = VPC.load(vpc_name)
+    vpc.apply_firewall(policy_file)
+
+def cmd_deploy_web():
+    validate_args("deploy-web", 4, "Usage: vpcctl deploy-web <vpc-name> <subnet-name> [port]")
+    vpc_name = sys.argv[2]
+    subnet_name = sys.argv[3]
+    port = int(sys.argv[4]) if len(sys.argv) > 4 else 8000
+    vpc = VPC.load(vpc_name)
+    vpc.deploy_webserver(subnet_name, port)
+
+def cmd_redeploy_web():
+    validate_args("redeploy-web", 2, "Usage: vpcctl redeploy-web <vpc-name>")
+    vpc_name = sys.argv[2]
+    vpc = VPC.load(vpc_name)
+
+    # Kill existing web servers and redeploy
+    Logger.info(f"Redeploying web servers for VPC {vpc_name}")
+    for subnet_name in vpc.subnets.keys():
+        ns_name = vpc.subnets[subnet_name]["namespace"]
+        # Kill existing python web servers
+        run_cmd(["ip", "netns", "exec", ns_name, "pkill", "-f", "python3.*http.server"], ignore_errors=True)
+
+    # Deploy web servers with appropriate ports
+    subnet_names = list(vpc.subnets.keys())
+    for i, subnet_name in enumerate(subnet_names):
+        port = 8000 + i
+        vpc.deploy_webserver(subnet_name, port)
+
+def cmd_show():
+    vpc_name = sys.argv[2]
+    vpc = VPC.load(vpc_name)
+    vpc.show()
+
+def cmd_delete():
+    vpc_name = sys.argv[2]
+    vpc = VPC.load(vpc_name)
+    vpc.delete()
+
+def _vpc_names():
+    """Configured VPC names, via one readdir (no per-entry stat/Path)"""
+    with os.scandir(CONFIG_DIR) as entries:
+        return sorted(e.name[:-5] for e in entries if e.name.endswith(".json"))
+
+def cmd_list():
+    vpcs = _vpc_names()
+    if vpcs:
+        print("\nConfigured VPCs:")
+        for vpc_name in vpcs:
+            print(f"  - {vpc_name}")
+    else:
+        print("\nNo VPCs configured")
+
+def _netns_names():
+    """Network namespace names via 'ip -json netns list'
+
+    Structured output instead of splitting the text listing line by line
+    (which breaks on the '(id: N)' suffix ip appends to named namespaces).
+    """
+    result = run_cmd(["ip", "-json", "netns", "list"], capture=True, ignore_errors=True)
+    if not (result and result.returncode == 0 and result.stdout.strip()):
+        return []
+    return [ns["name"] for ns in _json_loads(result.stdout)]
+
+def _vpc_bridges():
+    """Names of vpcctl-created bridges via 'ip -json link show'"""
+    result = run_cmd(["ip", "-json", "link", "show", "type", "bridge"], capture=True, ignore_errors=True)
+    if not (result and result.returncode == 0 and result.stdout.strip()):
+        return []
+    return [l["ifname"] for l in _json_loads(result.stdout)
+            if l["ifname"].startswith("vpc-")]
+
+def cmd_diagnose():
+    # Diagnostic command to check orphaned namespaces. Namespaces parked
+    # in the pool belong to deleted VPCs and aren't orphans
+    print("\nDiagnosing network state...")
+    pooled = _NS_POOL.pooled()
+    namespaces = [n for n in _netns_names() if n not in pooled]
+
+    print(f"\nFound {len(namespaces)} network namespaces:")
+    for ns_name in namespaces:
+        print(f"  - {ns_name}")
+
+    # Check for VPC bridges
+    bridges = _vpc_bridges()
+
+    print(f"\nFound {len(bridges)} VPC bridges:")
+    for bridge in bridges:
+        print(f"  - {bridge}")
+
+    # Check VPC configs
+    vpcs = _vpc_names() if CONFIG_DIR.exists() else []
+
+    # Suggest recovery
+    if namespaces and not vpcs:
+        print("\n⚠️  Found orphaned namespaces without VPC config!")
+        print("   Run 'vpcctl cleanup-orphans' to clean up")
+        print("   Or recreate VPCs to restore connectivity")
+
+def cmd_cleanup_orphans():
+    # Clean up orphaned namespaces and bridges
+    print("\nCleaning up orphaned network resources...")
+
+    # Remove namespaces (including pooled ones — this is a full cleanup)
+    # and drop the matching pool entries so the pool can't go stale
+    removed = []
+    for ns_name in _netns_names():
+        if '-public' in ns_name or '-private' in ns_name:
+            print(f"Removing namespace: {ns_name}")
+            run_cmd(["ip", "netns", "delete", ns_name], ignore_errors=True)
+            removed.append(ns_name)
+    _NS_POOL.drop(removed)
+
+    # Remove VPC bridges
+    for bridge_name in _vpc_bridges():
+        print(f"Removing bridge: {bridge_name}")
+        run_cmd(["ip", "link", "delete", bridge_name], ignore_errors=True)
+
+    print("✓ Cleanup complete")
+
+def cmd_recover():
+    # Recover VPC configurations from existing infrastructure
+    print("\nRecovering VPC configurations from existing infrastructure...")
+
+    # Parse VPC structure from existing namespaces, skipping ones parked
+    # in the pool — those belong to VPCs the user deliberately deleted
+    pooled = _NS_POOL.pooled()
+    vpcs = {}
+    for ns_name in _netns_names():
+        if ns_name not in pooled and '-' in ns_name:
+            parts = ns_name.split('-')
+            if len(parts) >= 2:
+                vpc_name = parts[0]
+                subnet_name = '-'.join(parts[1:])
+
+                if vpc_name not in vpcs:
+                    vpcs[vpc_name] = []
+                vpcs[vpc_name].append((subnet_name, ns_name))
+
+    print(f"Found {len(vpcs)} VPCs to recover:")
+    for vpc_name, subnets in vpcs.items():
+        print(f"  - {vpc_name}: {len(subnets)} subnets")
+
+    # Build every config in memory first, then write them all at the end —
+    # a crash mid-recovery leaves no torn or half-written config files
+    configs = {}
+    for vpc_name, subnets in vpcs.items():
+        print(f"\nRecovering VPC: {vpc_name}")
+
+        # Determine CIDR based on VPC name (common patterns); unknown names
+        # get a stable octet from blake2b — builtin hash() is salted per
+        # interpreter run, so recover would assign a different CIDR each
+        # time. Computed once per VPC and reused for the subnet CIDRs below.
+        known_octets = {"dev": 0, "prod": 1, "test": 2}
+        octet = known_octets.get(vpc_name)
+        if octet is None:
+            octet = hashlib.blake2b(vpc_name.encode(), digest_size=1).digest()[0] % 254
+        cidr = f"10.{octet}.0.0/16"
+
+        # Create VPC config
+        vpc_config = {
+            "name": vpc_name,
+            "cidr": cidr,
+            "subnets": {}
+        }
+
+        # Add subnets
+        subnet_counter = 1
+        for subnet_name, ns_name in subnets:
+            subnet_cidr = f"10.{octet}.{subnet_counter}.0/24"
+            subnet_ip = f"10.{octet}.{subnet_counter}.10/24"
+
+            subnet_type = "public" if "public" in subnet_name else "private"
+
+            vpc_config["subnets"][subnet_name] = {
+                "cidr": subnet_cidr,
+                "type": subnet_type,
+                "namespace": ns_name,
+                "ip": subnet_ip
+            }
+            subnet_counter += 1
+
+        configs[vpc_name] = vpc_config
+        print(f"✓ Recovered VPC {vpc_name} with {len(subnets)} subnets")
+
+    # Write phase: each config goes to a temp file and is renamed into
+    # place, so existing configs are replaced atomically
+    for vpc_name, vpc_config in configs.items():
+        _atomic_write(CONFIG_DIR / f"{vpc_name}.json", _json_dumps(vpc_config))
+
+    print(f"\n✓ Recovery complete! Recovered {len(vpcs)} VPCs")
+    print("You can now use 'vpcctl show <vpc-name>' to view configurations")
+
+def _host_link_state():
+    """One-shot snapshot of host links and addresses via 'ip -json'
+
+    Reading kernel state once and diffing against it lets the fix-up
+    commands skip work that is already in place instead of paying a full
+    exec+netlink round trip per redundant call.
+    """
+    links = {}
+    result = run_cmd(["ip", "-json", "link", "show"], capture=True, ignore_errors=True)
+    if result and result.returncode == 0 and result.stdout:
+        for link in _json_loads(result.stdout):
+            links[link["ifname"]] = {
+                "master": link.get("master"),
+                "up": "UP" in link.get("flags", []),
+            }
+    addrs = {}
+    result = run_cmd(["ip", "-json", "addr", "show"], capture=True, ignore_errors=True)
+    if result and result.returncode == 0 and result.stdout:
+        for link in _json_loads(result.stdout):
+            addrs[link["ifname"]] = {a["local"] for a in link.get("addr_info", [])}
+    return links, addrs
+
+def cmd_fix_connectivity():
+    # Fix connectivity issues for recovered VPCs
+    vpc_name = sys.argv[2] if len(sys.argv) > 2 else None
+    if not vpc_name:
+        print("Usage: vpcctl fix-connectivity <vpc-name>")
+        sys.exit(1)
+
+    print(f"\nFixing connectivity for VPC: {vpc_name}")
+    vpc = VPC.load(vpc_name)
+
+    # Query kernel state once up front; already-healthy pieces are skipped
+    # below instead of re-issued under ignore_exists
+    links, addrs = _host_link_state()
+
+    # Ensure bridge is up and has gateway IP (precomputed on the VPC)
+    gateway_ip = vpc._gateway
+    print(f"Setting up bridge {vpc.bridge} with gateway {gateway_ip}")
+
+    bridge_state = links.get(vpc.bridge)
+    if not (bridge_state and bridge_state["up"]):
+        run_cmd(["ip", "link", "set", vpc.bridge, "up"], ignore_errors=True)
+    if gateway_ip not in addrs.get(vpc.bridge, set()):
+        run_cmd(["ip", "addr", "add", f"{gateway_ip}/{vpc._prefix}", "dev", vpc.bridge], ignore_exists=True)
+
+    # Fix each subnet's connectivity
+    for subnet_name, subnet_info in vpc.subnets.items():
+        ns_name = subnet_info["namespace"]
+        subnet_cidr = subnet_info["cidr"]
+        subnet_ip = subnet_info["ip"]
+
+        print(f"Fixing connectivity for subnet {subnet_name} ({ns_name})")
+
+        # Create veth pair if it doesn't exist (use shorter names)
+        # Extract short identifier from namespace name
+        short_id = ns_name.replace('dev-', '').replace('prod-', '')[:6]
+        veth_host = f"vh-{short_id}"
+        veth_ns = f"vn-{short_id}"
+
+        host_state = links.get(veth_host)
+
+        # Create veth pair only if the host end is missing
+        if host_state is None:
+            run_cmd(["ip", "link", "add", veth_host, "type", "veth", "peer", "name", veth_ns], ignore_exists=True)
+
+        # Move one end to namespace (skip when it already left the host)
+        if host_state is None or veth_ns in links:
+            run_cmd(["ip", "link", "set", veth_ns, "netns", ns_name], ignore_errors=True)
+
+        # Configure host side, skipping what the snapshot shows is done
+        if not (host_state and host_state["master"] == vpc.bridge):
+            run_cmd(["ip", "link", "set", veth_host, "master", vpc.bridge], ignore_exists=True)
+        if not (host_state and host_state["up"]):
+            run_cmd(["ip", "link", "set", veth_host, "up"], ignore_errors=True)
+
+        # Configure namespace side in one batch (-force keeps going past
+        # pieces that are already in place)
+        run_ip_batch([
+            f"link set {veth_ns} up",
+            f"addr add {subnet_ip} dev {veth_ns}",
+            f"route add default via {gateway_ip}",
+        ], ns_name=ns_name, ignore_errors=True)
+
+        print(f"✓ Fixed connectivity for {subnet_name}")
+
+    # Add host routes to subnets in a single batch instead of one ip fork
+    # per subnet
+    run_ip_batch([
+        f"route add {subnet_info['cidr']} dev {vpc.bridge}"
+        for subnet_info in vpc.subnets.values()
+    ])
+
+    print(f"✓ Connectivity fixed for VPC {vpc_name}")
+    print("Web servers should now be accessible from host")
+
+def cmd_debug_servers():
+    # Debug web server connectivity
+    vpc_name = sys.argv[2] if len(sys.argv) > 2 else None
+    if not vpc_name:
+        print("Usage: vpcctl debug-servers <vpc-name>")
+        sys.exit(1)
+
+    print(f"\nDebugging web servers for VPC: {vpc_name}")
+    vpc = VPC.load(vpc_name)
+
+    namespaces = set(_netns_names())
+    for subnet_name, subnet_info in vpc.subnets.items():
+        ns_name = subnet_info["namespace"]
+        print(f"\n--- Debugging {subnet_name} ({ns_name}) ---")
+
+        # Check if namespace exists
+        if ns_name in namespaces:
+            print(f"✓ Namespace {ns_name} exists")
+        else:
+            print(f"✗ Namespace {ns_name} missing")
+            continue
+
+        # All in-namespace probes share one shell co-process: a single
+        # setns instead of four 'ip netns exec' round trips
+        with NsShell(ns_name) as shell:
+            # Check running processes in namespace
+            print("Running processes:")
+            result = shell.run("ps aux")
+            if result.stdout:
+                for line in result.stdout.split('\n'):
+                    if 'http.server' in line:
+                        print(f"  {line.strip()}")
+
+            # Check network interfaces in namespace
+            print("Network interfaces:")
+            result = shell.run("ip addr show")
+            if result.stdout:
+                for line in result.stdout.split('\n'):
+                    if 'inet ' in line:
+                        print(f"  {line.strip()}")
+
+            # Check listening ports
+            print("Listening ports:")
+            result = shell.run("netstat -tlnp")
+            if result.stdout:
+                for line in result.stdout.split('\n'):
+                    if ':800' in line:  # Look for ports 8000-8009
+                        print(f"  {line.strip()}")
+
+            # Test connectivity from namespace to gateway
+            gateway_ip = vpc._gateway
+            print(f"Testing connectivity to gateway {gateway_ip}:")
+            result = shell.run(f"ping -c 1 {gateway_ip}")
+            if result.returncode == 0:
+                print("  ✓ Can reach gateway")
+            else:
+                print("  ✗ Cannot reach gateway")
+
+    # Test from host side
+    print(f"\n--- Host connectivity test ---")
+    for subnet_name, subnet_info in vpc.subnets.items():
+        subnet_cidr = subnet_info["cidr"]
+        subnet_ip = subnet_cidr.split('/')[0].rsplit('.', 1)[0] + '.1'
+        print(f"Testing ping to {subnet_name} at {subnet_ip}:")
+        result = run_cmd(["ping", "-c", "1", subnet_ip], capture=True, ignore_errors=True)
+        if result and result.returncode == 0:
+            print("  ✓ Ping successful")
+        else:
+            print("  ✗ Ping failed")
+
+def cmd_fix_bridge():
+    # Fix bridge connectivity issues
+    vpc_name = sys.argv[2] if len(sys.argv) > 2 else None
+    if not vpc_name:
+        print("Usage: vpcctl fix-bridge <vpc-name>")
+        sys.exit(1)
+
+    print(f"\nFixing bridge connectivity for VPC: {vpc_name}")
+    vpc = VPC.load(vpc_name)
+
+    # Enable IP forwarding
+    print("Enabling IP forwarding...")
+    run_cmd(["sysctl", "-w", "net.ipv4.ip_forward=1"], ignore_errors=True)
+
+    # Configure bridge properly
+    bridge = vpc.bridge
+
+    print(f"Configuring bridge {bridge}...")
+    run_cmd(["ip", "link", "set", bridge, "up"], ignore_errors=True)
+    run_cmd(["ip", "addr", "flush", "dev", bridge], ignore_errors=True)
+
+    # Add gateway IPs for each subnet to the bridge
+    for subnet_name, subnet_info in vpc.subnets.items():
+        subnet_cidr = subnet_info["cidr"]
+        network = IPUtils.parse_network(subnet_cidr)
+        gateway_ip = str(network.network_address + 1) + f"/{network.prefixlen}"
+        run_cmd(["ip", "addr", "add", gateway_ip, "dev", bridge], ignore_exists=True)
+        print(f"Added gateway {gateway_ip} for {subnet_name}")
+
+    # Enable bridge forwarding
+    try:
+        Path(f"/sys/class/net/{bridge}/bridge/stp_state").write_text("1\n")
+    except OSError as e:
+        Logger.warn(f"Could not set stp_state for {bridge}: {e}")
+
+    # Fix each subnet connection
+    for subnet_name, subnet_info in vpc.subnets.items():
+        ns_name = subnet_info["namespace"]
+        subnet_cidr = subnet_info["cidr"]
+
+        print(f"Fixing {subnet_name} connectivity...")
+
+        # Get the correct subnet IP (second IP, since first is gateway)
+        network = IPUtils.parse_network(subnet_cidr)
+        subnet_ip = str(list(network.hosts())[1]) + f"/{network.prefixlen}"
+
+        # Remove old veth pairs
+        short_id = ns_name.replace('dev-', '').replace('prod-', '')[:6]
+        veth_host = f"vh-{short_id}"
+        veth_ns = f"vn-{short_id}"
+
+        run_cmd(["ip", "link", "delete", veth_host], ignore_errors=True)
+
+        # Create new veth pair
+        run_cmd(["ip", "link", "add", veth_host, "type", "veth", "peer", "name", veth_ns])
+
+        # Move namespace end to namespace
+        run_cmd(["ip", "link", "set", veth_ns, "netns", ns_name])
+
+        # Configure host side
+        run_cmd(["ip", "link", "set", veth_host, "master", bridge])
+        run_cmd(["ip", "link", "set", veth_host, "up"])
+
+        # Configure namespace side
+        run_cmd(["ip", "netns", "exec", ns_name, "ip", "link", "set", "lo", "up"])
+        run_cmd(["ip", "netns", "exec", ns_name, "ip", "link", "set", veth_ns, "up"])
+        run_cmd(["ip", "netns", "exec", ns_name, "ip", "addr", "flush", "dev", veth_ns])
+        run_cmd(["ip", "netns", "exec", ns_name, "ip", "addr", "add", subnet_ip, "dev", veth_ns])
+        run_cmd(["ip", "netns", "exec", ns_name, "ip", "route", "flush", "default"])
+
+        # Use the gateway IP that's in the same subnet  
+        network = IPUtils.parse_network(subnet_cidr)
+        subnet_gateway = str(network.network_address + 1)  # First IP in subnet as gateway
+        run_cmd(["ip", "netns", "exec", ns_name, "ip", "route", "add", "default", "via", subnet_gateway], ignore_exists=True)
+
+        print(f"✓ Fixed {subnet_name} - IP: {subnet_ip}")
+
+    # Add host routes
+    for subnet_name, subnet_info in vpc.subnets.items():
+        subnet_cidr = subnet_info["cidr"]
+        run_cmd(["ip", "route", "del", subnet_cidr], ignore_errors=True)
+        run_cmd(["ip", "route", "add", subnet_cidr, "dev", bridge])
+
+    print("✓ Bridge connectivity fixed!")
+    print("Testing connectivity...")
+
+    # Quick connectivity test
+    for subnet_name, subnet_info in vpc.subnets.items():
+        subnet_cidr = subnet_info["cidr"]
+        network = IPUtils.parse_network(subnet_cidr)
+        test_ip = str(list(network.hosts())[0])
+
+        result = run_cmd(["ping", "-c", "1", "-W", "2", test_ip], capture=True, ignore_errors=True)
+        if result and result.returncode == 0:
+            print(f"✓ {subnet_name} ({test_ip}) - Connectivity OK")
+        else:
+            print(f"✗ {subnet_name} ({test_ip}) - Still no connectivity")
+
+COMMANDS = {
+    "create": cmd_create,
+    "add-subnet": cmd_add_subnet,
+    "add-subnets": cmd_add_subnets,
+    "enable-nat": cmd_enable_nat,
+    "apply-policy": cmd_apply_policy,
+    "deploy-web": cmd_deploy_web,
+    "redeploy-web": cmd_redeploy_web,
+    "show": cmd_show,
+    "delete": cmd_delete,
+    "list": cmd_list,
+    "diagnose": cmd_diagnose,
+    "cleanup-orphans": cmd_cleanup_orphans,
+    "recover": cmd_recover,
+    "fix-connectivity": cmd_fix_connectivity,
+    "debug-servers": cmd_debug_servers,
+    "fix-bridge": cmd_fix_bridge,
+}
+
 def main():
     """Main CLI entry point"""
     if len(sys.argv) < 2:
@@ -369,6 +1451,7 @@ def main():
         print("\nCommands:")
         print("  create <vpc-name> <cidr>          - Create new VPC")
         print("  add-subnet <vpc> <name> <cidr> <type>  - Add subnet (type: public/private)")
+        print("  add-subnets <vpc> <manifest.json> - Add several subnets concurrently")
         print("  enable-nat <vpc> [interface]      - Enable NAT gateway")
         print("  apply-policy <vpc> <policy.json>  - Apply firewall policy")
         print("  deploy-web <vpc> <subnet> [port]  - Deploy web server")
@@ -384,433 +1467,14 @@ def main():
         sys.exit(1)
     
     command = sys.argv[1]
-    
+
+    handler = COMMANDS.get(command)
+    if handler is None:
+        Logger.error(f"Unknown command: {command}")
+        sys.exit(1)
+
     try:
-        if command == "create":
-            validate_args(command, 4, "Usage: vpcctl create <vpc-name> <cidr>")
-            vpc_name = sys.argv[2]
-            cidr = sys.argv[3]
-            vpc = VPC(vpc_name, cidr)
-            vpc.create()
-        
-        elif command == "add-subnet":
-            validate_args(command, 5, "Usage: vpcctl add-subnet <vpc-name> <subnet-name> <cidr> [type]")
-            vpc_name = sys.argv[2]
-            subnet_name = sys.argv[3]
-            cidr = sys.argv[4]
-            subnet_type = sys.argv[5] if len(sys.argv) > 5 else "private"
-            vpc = VPC.load(vpc_name)
-            vpc.add_subnet(subnet_name, cidr, subnet_type)
-        
-        elif command == "enable-nat":
-            vpc_name = sys.argv[2]
-            interface = sys.argv[3] if len(sys.argv) > 3 else "eth0"
-            vpc = VPC.load(vpc_name)
-            vpc.enable_nat(interface)
-        
-        elif command == "apply-policy":
-            vpc_name = sys.argv[2]
-            policy_file = sys.argv[3]
-            vpc = VPC.load(vpc_name)
-            vpc.apply_firewall(policy_file)
-        
-        elif command == "deploy-web":
-            validate_args(command, 4, "Usage: vpcctl deploy-web <vpc-name> <subnet-name> [port]")
-            vpc_name = sys.argv[2]
-            subnet_name = sys.argv[3]
-            port = int(sys.argv[4]) if len(sys.argv) > 4 else 8000
-            vpc = VPC.load(vpc_name)
-            vpc.deploy_webserver(subnet_name, port)
-        
-        elif command == "redeploy-web":
-            validate_args(command, 2, "Usage: vpcctl redeploy-web <vpc-name>")
-            vpc_name = sys.argv[2]
-            vpc = VPC.load(vpc_name)
-            
-            # Kill existing web servers and redeploy
-            Logger.info(f"Redeploying web servers for VPC {vpc_name}")
-            for subnet_name in vpc.subnets.keys():
-                ns_name = vpc.subnets[subnet_name]["namespace"]
-                # Kill existing python web servers
-                run_cmd(f"ip netns exec {ns_name} pkill -f 'python3.*http.server'", ignore_errors=True)
-            
-            # Deploy web servers with appropriate ports
-            subnet_names = list(vpc.subnets.keys())
-            for i, subnet_name in enumerate(subnet_names):
-                port = 8000 + i
-                vpc.deploy_webserver(subnet_name, port)
-        
-        elif command == "show":
-            vpc_name = sys.argv[2]
-            vpc = VPC.load(vpc_name)
-            vpc.show()
-        
-        elif command == "delete":
-            vpc_name = sys.argv[2]
-            vpc = VPC.load(vpc_name)
-            vpc.delete()
-        
-        elif command == "list":
-            vpcs = list(CONFIG_DIR.glob("*.json"))
-            if vpcs:
-                print("\nConfigured VPCs:")
-                for vpc_file in vpcs:
-                    print(f"  - {vpc_file.stem}")
-            else:
-                print("\nNo VPCs configured")
-        
-        elif command == "diagnose":
-            # Diagnostic command to check orphaned namespaces
-            print("\nDiagnosing network state...")
-            result = run_cmd("ip netns list", capture_output=True)
-            namespaces = result.stdout.strip().split('\n') if result.stdout.strip() else []
-            
-            print(f"\nFound {len(namespaces)} network namespaces:")
-            for ns in namespaces:
-                ns_name = ns.split()[0] if ns.strip() else ""
-                if ns_name:
-                    print(f"  - {ns_name}")
-            
-            # Check for VPC bridges
-            result = run_cmd("ip link show type bridge", capture_output=True)
-            bridges = []
-            for line in result.stdout.split('\n'):
-                if 'vpc-' in line:
-                    bridge_name = line.split(':')[1].strip().split('@')[0]
-                    bridges.append(bridge_name)
-            
-            print(f"\nFound {len(bridges)} VPC bridges:")
-            for bridge in bridges:
-                print(f"  - {bridge}")
-            
-            # Check VPC configs
-            vpcs = list(CONFIG_DIR.glob("*.json")) if CONFIG_DIR.exists() else []
-            
-            # Suggest recovery
-            if namespaces and not vpcs:
-                print("\n⚠️  Found orphaned namespaces without VPC config!")
-                print("   Run 'vpcctl cleanup-orphans' to clean up")
-                print("   Or recreate VPCs to restore connectivity")
-        
-        elif command == "cleanup-orphans":
-            # Clean up orphaned namespaces and bridges
-            print("\nCleaning up orphaned network resources...")
-            
-            # Remove namespaces
-            result = run_cmd("ip netns list", capture_output=True)
-            namespaces = result.stdout.strip().split('\n') if result.stdout.strip() else []
-            
-            for ns in namespaces:
-                ns_name = ns.split()[0] if ns.strip() else ""
-                if ns_name and ('-public' in ns_name or '-private' in ns_name):
-                    print(f"Removing namespace: {ns_name}")
-                    run_cmd(f"ip netns delete {ns_name}", ignore_errors=True)
-            
-            # Remove VPC bridges
-            result = run_cmd("ip link show type bridge", capture_output=True)
-            for line in result.stdout.split('\n'):
-                if 'vpc-' in line:
-                    bridge_name = line.split(':')[1].strip().split('@')[0]
-                    print(f"Removing bridge: {bridge_name}")
-                    run_cmd(f"ip link delete {bridge_name}", ignore_errors=True)
-            
-            print("✓ Cleanup complete")
-        
-        elif command == "recover":
-            # Recover VPC configurations from existing infrastructure
-            print("\nRecovering VPC configurations from existing infrastructure...")
-            
-            # Get existing namespaces
-            result = run_cmd("ip netns list", capture_output=True)
-            namespaces = result.stdout.strip().split('\n') if result.stdout.strip() else []
-            
-            # Parse VPC structure from namespaces
-            vpcs = {}
-            for ns in namespaces:
-                ns_name = ns.split()[0] if ns.strip() else ""
-                if '-' in ns_name:
-                    parts = ns_name.split('-')
-                    if len(parts) >= 2:
-                        vpc_name = parts[0]
-                        subnet_name = '-'.join(parts[1:])
-                        
-                        if vpc_name not in vpcs:
-                            vpcs[vpc_name] = []
-                        vpcs[vpc_name].append((subnet_name, ns_name))
-            
-            print(f"Found {len(vpcs)} VPCs to recover:")
-            for vpc_name, subnets in vpcs.items():
-                print(f"  - {vpc_name}: {len(subnets)} subnets")
-            
-            # Recover each VPC
-            for vpc_name, subnets in vpcs.items():
-                print(f"\nRecovering VPC: {vpc_name}")
-                
-                # Determine CIDR based on VPC name (common patterns)
-                if vpc_name == "dev":
-                    cidr = "10.0.0.0/16"
-                elif vpc_name == "prod":
-                    cidr = "10.1.0.0/16"
-                elif vpc_name == "test":
-                    cidr = "10.2.0.0/16"
-                else:
-                    cidr = f"10.{hash(vpc_name) % 254}.0.0/16"
-                
-                # Create VPC config
-                vpc_config = {
-                    "name": vpc_name,
-                    "cidr": cidr,
-                    "subnets": {}
-                }
-                
-                # Add subnets
-                subnet_counter = 1
-                for subnet_name, ns_name in subnets:
-                    subnet_cidr = f"10.{0 if vpc_name == 'dev' else 1 if vpc_name == 'prod' else 2}.{subnet_counter}.0/24"
-                    subnet_ip = f"10.{0 if vpc_name == 'dev' else 1 if vpc_name == 'prod' else 2}.{subnet_counter}.10/24"
-                    
-                    subnet_type = "public" if "public" in subnet_name else "private"
-                    
-                    vpc_config["subnets"][subnet_name] = {
-                        "cidr": subnet_cidr,
-                        "type": subnet_type,
-                        "namespace": ns_name,
-                        "ip": subnet_ip
-                    }
-                    subnet_counter += 1
-                
-                # Save config
-                config_file = CONFIG_DIR / f"{vpc_name}.json"
-                with open(config_file, 'w') as f:
-                    json.dump(vpc_config, f, indent=2)
-                
-                print(f"✓ Recovered VPC {vpc_name} with {len(subnets)} subnets")
-            
-            print(f"\n✓ Recovery complete! Recovered {len(vpcs)} VPCs")
-            print("You can now use 'vpcctl show <vpc-name>' to view configurations")
-        
-        elif command == "fix-connectivity":
-            # Fix connectivity issues for recovered VPCs
-            vpc_name = sys.argv[2] if len(sys.argv) > 2 else None
-            if not vpc_name:
-                print("Usage: vpcctl fix-connectivity <vpc-name>")
-                sys.exit(1)
-            
-            print(f"\nFixing connectivity for VPC: {vpc_name}")
-            vpc = VPC.load(vpc_name)
-            
-            # Ensure bridge is up and has gateway IP
-            gateway_ip = IPUtils.get_gateway_ip(vpc.cidr)
-            print(f"Setting up bridge {vpc.bridge} with gateway {gateway_ip}")
-            
-            run_cmd(f"ip link set {vpc.bridge} up", ignore_errors=True)
-            run_cmd(f"ip addr add {gateway_ip} dev {vpc.bridge}", ignore_exists=True)
-            
-            # Fix each subnet's connectivity
-            for subnet_name, subnet_info in vpc.subnets.items():
-                ns_name = subnet_info["namespace"]
-                subnet_cidr = subnet_info["cidr"]
-                subnet_ip = subnet_info["ip"]
-                
-                print(f"Fixing connectivity for subnet {subnet_name} ({ns_name})")
-                
-                # Create veth pair if it doesn't exist (use shorter names)
-                # Extract short identifier from namespace name
-                short_id = ns_name.replace('dev-', '').replace('prod-', '')[:6]
-                veth_host = f"vh-{short_id}"
-                veth_ns = f"vn-{short_id}"
-                
-                # Try to create veth pair (ignore if exists)
-                run_cmd(f"ip link add {veth_host} type veth peer name {veth_ns}", ignore_exists=True)
-                
-                # Move one end to namespace
-                run_cmd(f"ip link set {veth_ns} netns {ns_name}", ignore_errors=True)
-                
-                # Configure host side
-                run_cmd(f"ip link set {veth_host} master {vpc.bridge}", ignore_exists=True)
-                run_cmd(f"ip link set {veth_host} up", ignore_errors=True)
-                
-                # Configure namespace side
-                run_cmd(f"ip netns exec {ns_name} ip link set {veth_ns} up", ignore_errors=True)
-                run_cmd(f"ip netns exec {ns_name} ip addr add {subnet_ip} dev {veth_ns}", ignore_exists=True)
-                run_cmd(f"ip netns exec {ns_name} ip route add default via {gateway_ip.split('/')[0]}", ignore_exists=True)
-                
-                print(f"✓ Fixed connectivity for {subnet_name}")
-            
-            # Add host routes to subnets
-            for subnet_name, subnet_info in vpc.subnets.items():
-                subnet_cidr = subnet_info["cidr"]
-                run_cmd(f"ip route add {subnet_cidr} dev {vpc.bridge}", ignore_exists=True)
-            
-            print(f"✓ Connectivity fixed for VPC {vpc_name}")
-            print("Web servers should now be accessible from host")
-        
-        elif command == "debug-servers":
-            # Debug web server connectivity
-            vpc_name = sys.argv[2] if len(sys.argv) > 2 else None
-            if not vpc_name:
-                print("Usage: vpcctl debug-servers <vpc-name>")
-                sys.exit(1)
-            
-            print(f"\nDebugging web servers for VPC: {vpc_name}")
-            vpc = VPC.load(vpc_name)
-            
-            for subnet_name, subnet_info in vpc.subnets.items():
-                ns_name = subnet_info["namespace"]
-                print(f"\n--- Debugging {subnet_name} ({ns_name}) ---")
-                
-                # Check if namespace exists
-                result = run_cmd("ip netns list", capture_output=True)
-                if ns_name in result.stdout:
-                    print(f"✓ Namespace {ns_name} exists")
-                else:
-                    print(f"✗ Namespace {ns_name} missing")
-                    continue
-                
-                # Check running processes in namespace
-                print("Running processes:")
-                result = run_cmd(f"ip netns exec {ns_name} ps aux", capture_output=True, ignore_errors=True)
-                if result and result.stdout:
-                    for line in result.stdout.split('\n'):
-                        if 'http.server' in line:
-                            print(f"  {line.strip()}")
-                
-                # Check network interfaces in namespace
-                print("Network interfaces:")
-                result = run_cmd(f"ip netns exec {ns_name} ip addr show", capture_output=True, ignore_errors=True)
-                if result and result.stdout:
-                    for line in result.stdout.split('\n'):
-                        if 'inet ' in line:
-                            print(f"  {line.strip()}")
-                
-                # Check listening ports
-                print("Listening ports:")
-                result = run_cmd(f"ip netns exec {ns_name} netstat -tlnp", capture_output=True, ignore_errors=True)
-                if result and result.stdout:
-                    for line in result.stdout.split('\n'):
-                        if ':800' in line:  # Look for ports 8000-8009
-                            print(f"  {line.strip()}")
-                
-                # Test connectivity from namespace to gateway
-                gateway_ip = IPUtils.get_gateway_ip(vpc.cidr).split('/')[0]
-                print(f"Testing connectivity to gateway {gateway_ip}:")
-                result = run_cmd(f"ip netns exec {ns_name} ping -c 1 {gateway_ip}", capture_output=True, ignore_errors=True)
-                if result and result.returncode == 0:
-                    print("  ✓ Can reach gateway")
-                else:
-                    print("  ✗ Cannot reach gateway")
-            
-            # Test from host side
-            print(f"\n--- Host connectivity test ---")
-            for subnet_name, subnet_info in vpc.subnets.items():
-                subnet_cidr = subnet_info["cidr"]
-                subnet_ip = subnet_cidr.split('/')[0].rsplit('.', 1)[0] + '.1'
-                print(f"Testing ping to {subnet_name} at {subnet_ip}:")
-                result = run_cmd(f"ping -c 1 {subnet_ip}", capture_output=True, ignore_errors=True)
-                if result and result.returncode == 0:
-                    print("  ✓ Ping successful")
-                else:
-                    print("  ✗ Ping failed")
-        
-        elif command == "fix-bridge":
-            # Fix bridge connectivity issues
-            vpc_name = sys.argv[2] if len(sys.argv) > 2 else None
-            if not vpc_name:
-                print("Usage: vpcctl fix-bridge <vpc-name>")
-                sys.exit(1)
-            
-            print(f"\nFixing bridge connectivity for VPC: {vpc_name}")
-            vpc = VPC.load(vpc_name)
-            
-            # Enable IP forwarding
-            print("Enabling IP forwarding...")
-            run_cmd("echo 1 > /proc/sys/net/ipv4/ip_forward", ignore_errors=True)
-            
-            # Configure bridge properly
-            bridge = vpc.bridge
-            
-            print(f"Configuring bridge {bridge}...")
-            run_cmd(f"ip link set {bridge} up", ignore_errors=True)
-            run_cmd(f"ip addr flush dev {bridge}", ignore_errors=True)
-            
-            # Add gateway IPs for each subnet to the bridge
-            for subnet_name, subnet_info in vpc.subnets.items():
-                subnet_cidr = subnet_info["cidr"]
-                network = ipaddress.IPv4Network(subnet_cidr, strict=False)
-                gateway_ip = str(network.network_address + 1) + f"/{network.prefixlen}"
-                run_cmd(f"ip addr add {gateway_ip} dev {bridge}", ignore_exists=True)
-                print(f"Added gateway {gateway_ip} for {subnet_name}")
-            
-            # Enable bridge forwarding
-            run_cmd(f"echo 1 > /sys/class/net/{bridge}/bridge/stp_state", ignore_errors=True)
-            
-            # Fix each subnet connection
-            for subnet_name, subnet_info in vpc.subnets.items():
-                ns_name = subnet_info["namespace"]
-                subnet_cidr = subnet_info["cidr"]
-                
-                print(f"Fixing {subnet_name} connectivity...")
-                
-                # Get the correct subnet IP (second IP, since first is gateway)
-                network = ipaddress.IPv4Network(subnet_cidr, strict=False)
-                subnet_ip = str(list(network.hosts())[1]) + f"/{network.prefixlen}"
-                
-                # Remove old veth pairs
-                short_id = ns_name.replace('dev-', '').replace('prod-', '')[:6]
-                veth_host = f"vh-{short_id}"
-                veth_ns = f"vn-{short_id}"
-                
-                run_cmd(f"ip link delete {veth_host}", ignore_errors=True)
-                
-                # Create new veth pair
-                run_cmd(f"ip link add {veth_host} type veth peer name {veth_ns}")
-                
-                # Move namespace end to namespace
-                run_cmd(f"ip link set {veth_ns} netns {ns_name}")
-                
-                # Configure host side
-                run_cmd(f"ip link set {veth_host} master {bridge}")
-                run_cmd(f"ip link set {veth_host} up")
-                
-                # Configure namespace side
-                run_cmd(f"ip netns exec {ns_name} ip link set lo up")
-                run_cmd(f"ip netns exec {ns_name} ip link set {veth_ns} up")
-                run_cmd(f"ip netns exec {ns_name} ip addr flush dev {veth_ns}")
-                run_cmd(f"ip netns exec {ns_name} ip addr add {subnet_ip} dev {veth_ns}")
-                run_cmd(f"ip netns exec {ns_name} ip route flush default")
-                
-                # Use the gateway IP that's in the same subnet  
-                network = ipaddress.IPv4Network(subnet_cidr, strict=False)
-                subnet_gateway = str(network.network_address + 1)  # First IP in subnet as gateway
-                run_cmd(f"ip netns exec {ns_name} ip route add default via {subnet_gateway}", ignore_exists=True)
-                
-                print(f"✓ Fixed {subnet_name} - IP: {subnet_ip}")
-            
-            # Add host routes
-            for subnet_name, subnet_info in vpc.subnets.items():
-                subnet_cidr = subnet_info["cidr"]
-                run_cmd(f"ip route del {subnet_cidr}", ignore_errors=True)
-                run_cmd(f"ip route add {subnet_cidr} dev {bridge}")
-            
-            print("✓ Bridge connectivity fixed!")
-            print("Testing connectivity...")
-            
-            # Quick connectivity test
-            for subnet_name, subnet_info in vpc.subnets.items():
-                subnet_cidr = subnet_info["cidr"]
-                network = ipaddress.IPv4Network(subnet_cidr, strict=False)
-                test_ip = str(list(network.hosts())[0])
-                
-                result = run_cmd(f"ping -c 1 -W 2 {test_ip}", capture_output=True, ignore_errors=True)
-                if result and result.returncode == 0:
-                    print(f"✓ {subnet_name} ({test_ip}) - Connectivity OK")
-                else:
-                    print(f"✗ {subnet_name} ({test_ip}) - Still no connectivity")
-        
-        else:
-            Logger.error(f"Unknown command: {command}")
-            sys.exit(1)
-    
+        handler()
     except Exception as e:
         Logger.error(f"Operation failed: {e}")
         sys.exit(1)